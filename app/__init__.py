@@ -28,5 +28,14 @@ def create_app(config_class=Config):
     from app.main_routes import bp as main_blueprint
     app.register_blueprint(api_blueprint)
     app.register_blueprint(main_blueprint)
+
+    if app.config.get('ROOM_LIFECYCLE_ENABLED'):
+        from app.room_lifecycle import start_lifecycle_manager
+
+        # Started on the first request rather than here, so it only runs in
+        # processes that serve traffic (not the reloader parent or CLI scripts)
+        @app.before_request
+        def ensure_lifecycle_manager():
+            start_lifecycle_manager(app)
     
     return app
\ No newline at end of file
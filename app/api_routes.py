@@ -1,11 +1,16 @@
 import uuid
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from app import db, socketio
 from app.models import User, Room, Problem, TestCase, SessionEvent
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, decode_token
 from flask_socketio import join_room, leave_room, emit
 from app.code_executor import run_code
-from datetime import timedelta
+from app.checkers import check_output
+from app.session_history import queue_code_frame, seek, replay
+from app.room_lifecycle import load_room, touch_room, lifecycle_report
+from datetime import datetime, timedelta, timezone
+import json
+import threading
 
 
 # Create a Blueprint for API routes
@@ -15,12 +20,35 @@ bp = Blueprint('api', __name__, url_prefix='/api')
 # Format: {room_id: [{'username': 'user1', 'socket_id': 'sid1'}, ...]}
 active_users = {}
 
+# Number of logins currently being checked per client IP
+# Format: {ip: count}
+logins_in_progress = {}
+logins_lock = threading.Lock()
+
+def acquire_login_slot(ip):
+    """Reserves a login slot for an IP, returning False if it already has too many in flight."""
+    limit = current_app.config.get('LOGIN_MAX_CONCURRENT_PER_IP', 4)
+    with logins_lock:
+        if logins_in_progress.get(ip, 0) >= limit:
+            return False
+        logins_in_progress[ip] = logins_in_progress.get(ip, 0) + 1
+        return True
+
+def release_login_slot(ip):
+    with logins_lock:
+        remaining = logins_in_progress.get(ip, 0) - 1
+        if remaining > 0:
+            logins_in_progress[ip] = remaining
+        else:
+            logins_in_progress.pop(ip, None)
+
 def record_event(room_id, event_type, payload=None):
     event = SessionEvent()
     event.room_id = str(room_id)
     event.event_type = event_type
     event.payload = payload or {}
     db.session.add(event)
+    touch_room(room_id)
     db.session.commit()
 
 # ... (Authentication and other routes remain the same) ...
@@ -48,12 +76,22 @@ def login_user():
     data = request.get_json()
     username = data.get('username')
     password = data.get('password')
-    user = User.query.filter_by(username=username).first()
-    if user and user.check_password(password):
-        access_token = create_access_token(identity=str(user.id))
-        return jsonify(access_token=access_token), 200
-    else:
-        return jsonify({"error": "Invalid credentials"}), 401
+    ip = request.remote_addr or 'unknown'
+    if not acquire_login_slot(ip):
+        return jsonify({"error": "Too many concurrent login attempts"}), 429
+    try:
+        user = User.query.filter_by(username=username).first()
+        if user and user.check_password(password):
+            # Upgrade hashes made with old work-factor settings while we have the plaintext
+            if user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
+            access_token = create_access_token(identity=str(user.id))
+            return jsonify(access_token=access_token), 200
+        else:
+            return jsonify({"error": "Invalid credentials"}), 401
+    finally:
+        release_login_slot(ip)
     
 @bp.route('/auth/forgot', methods=['POST'])
 def forgot_password():
@@ -112,7 +150,7 @@ def create_room():
 
 @bp.route('/rooms/<string:room_id>', methods=['GET'])
 def get_room(room_id):
-    room = Room.query.get(room_id)
+    room = load_room(room_id)
     if not room:
         return jsonify({"error": "Room not found"}), 404
     problem_details = {}
@@ -154,6 +192,7 @@ def test_socket():
 
 @bp.route('/sessions/<string:room_id>/timeline', methods=['GET'])
 def get_session_timeline(room_id):
+    load_room(room_id)  # Restores the room's events if it was archived
     events = db.session.query(SessionEvent).filter_by(room_id=room_id).order_by(SessionEvent.created_at).all()
     
     timeline = []
@@ -173,6 +212,7 @@ def get_session_timeline(room_id):
     
 @bp.route('/sessions/<room_id>/summary', methods=["GET"])
 def get_session_summary(room_id):
+    load_room(room_id)  # Restores the room's events if it was archived
     events = db.session.query(SessionEvent).filter_by(room_id=room_id).all()
     
     event_counts = {}
@@ -191,12 +231,80 @@ def get_session_summary(room_id):
         'duration_minutes': None
     }), 200
 
+def parse_timestamp(value):
+    """Parses an ISO-8601 query parameter (UTC if no offset), returning None if it is missing."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+@bp.route('/sessions/<string:room_id>/code', methods=['GET'])
+def get_session_code(room_id):
+    """Returns the room's code as it was at ?at=<iso timestamp> (default: latest)."""
+    load_room(room_id)  # Restores the room's history if it was archived
+    try:
+        at = parse_timestamp(request.args.get('at'))
+    except ValueError:
+        return jsonify({"error": "at must be an ISO-8601 timestamp"}), 400
+
+    frame = seek(room_id, at)
+    if not frame:
+        return jsonify({"error": "No code history for this room"}), 404
+    seq, created_at, code_content = frame
+    return jsonify({
+        'room_id': room_id,
+        'seq': seq,
+        'created_at': created_at.isoformat() if created_at else None,
+        'code_content': code_content
+    }), 200
+
+@bp.route('/sessions/<string:room_id>/replay', methods=['GET'])
+def replay_session(room_id):
+    """
+    Streams the room's code history as newline-delimited JSON frames,
+    optionally limited to ?start=<iso>&end=<iso>.
+    """
+    load_room(room_id)  # Restores the room's history if it was archived
+    try:
+        start = parse_timestamp(request.args.get('start'))
+        end = parse_timestamp(request.args.get('end'))
+    except ValueError:
+        return jsonify({"error": "start and end must be ISO-8601 timestamps"}), 400
+
+    def generate():
+        for frame in replay(room_id, start, end):
+            yield json.dumps(frame) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@bp.route('/admin/lifecycle', methods=['GET'])
+@jwt_required()
+def get_lifecycle_report():
+    """Reports room archival throughput and hot/cold table sizes."""
+    return jsonify(lifecycle_report()), 200
+
 ## --- WebSocket Event Handlers ---
 @socketio.on('connect')
 def handle_connect():
     print(f"Client connected")
     emit('connected', {'message': 'Connected to server'})
 
+@socketio.on('disconnect')
+def handle_disconnect(*args):
+    """Drops a closed socket's users from active_users so their rooms can go idle."""
+    for room_id in list(active_users):
+        gone = [user for user in active_users[room_id] if user.get('socket_id') == request.sid]
+        if not gone:
+            continue
+        active_users[room_id] = [user for user in active_users[room_id] if user.get('socket_id') != request.sid]
+        if not active_users[room_id]:
+            del active_users[room_id]
+        for user in gone:
+            print(f"User {user['username']} disconnected from room {room_id}")
+            emit('user_left', {'username': user['username']}, to=room_id)
+
 @socketio.on('test_message')
 def handle_test_message(data):
     """Simple test event to verify socket communication"""
@@ -216,6 +324,7 @@ def handle_join_room(data):
     room_id = data.get('room_id')
     username = data.get('username', 'A user')
     print(f"User {username} joining room {room_id}")
+    load_room(room_id)  # Restores the room if it was archived
     
     # DEBUG: Check current rooms before joining
     from flask_socketio import rooms
@@ -234,9 +343,12 @@ def handle_join_room(data):
     if room_id not in active_users:
         active_users[room_id] = []
     
-    # Add user if not already in the room
-    if username not in [user['username'] for user in active_users[room_id]]:
-        active_users[room_id].append({'username': username})
+    # Add user if not already in the room, otherwise point them at their new socket
+    existing = [user for user in active_users[room_id] if user['username'] == username]
+    if existing:
+        existing[0]['socket_id'] = request.sid
+    else:
+        active_users[room_id].append({'username': username, 'socket_id': request.sid})
         print(f"Added {username} to room {room_id}. Active users: {[u['username'] for u in active_users[room_id]]}")
     
     # Broadcast to other users in the room
@@ -275,17 +387,19 @@ def handle_code_change(data):
     print(f"[code_change] Current socket rooms: {current_rooms}")
     print(f"[code_change] Requesting client is in rooms: {current_rooms}")
     
+    # Broadcast first so live sync never waits on the database
+    print(f"[code_change] Emitting code_update to room {room_id} with content: {new_code[:30]}...")
+    emit('code_update', {'code_content': new_code, 'message_id': message_id}, to=room_id, include_self=False)
+    print(f"[code_change] Emit completed for room {room_id}")
+    
     # First try to get the room from database
-    room = Room.query.get(room_id)
+    room = load_room(room_id)
     if room:
         print(f"[code_change] Room found: {room_id}, updating code.")
         room.code_content = new_code
         db.session.commit()
+        queue_code_frame(room_id, new_code)
         record_event(room_id, "code_change", {"message_id": message_id, "length": len(new_code or "")})
-        # Broadcast to ALL users in the room (including sender for perfect sync)
-        print(f"[code_change] Emitting code_update to room {room_id} with content: {new_code[:30]}...")
-        emit('code_update', {'code_content': new_code, 'message_id': message_id}, to=room_id, include_self=False)
-        print(f"[code_change] Emit completed for room {room_id}")
     else:
         print(f"[code_change] Room NOT found: {room_id}, creating it...")
         # Create the room if it doesn't exist
@@ -295,20 +409,14 @@ def handle_code_change(data):
             new_room.created_by = None
             new_room.code_content = new_code
             db.session.add(new_room)
-            record_event(room_id, "code_change", {"message_id": message_id, "length": len(new_code or "")})
             db.session.commit()
+            queue_code_frame(room_id, new_code)
+            record_event(room_id, "code_change", {"message_id": message_id, "length": len(new_code or "")})
             print(f"[code_change] Created new room: {room_id}")
-            # Broadcast to ALL users in the room
-            print(f"[code_change] Emitting code_update to room {room_id} with content: {new_code[:30]}...")
-            emit('code_update', {'code_content': new_code, 'message_id': message_id}, to=room_id, include_self=False)
-            print(f"[code_change] Emit completed for room {room_id}")
         except Exception as e:
             print(f"[code_change] Error creating room: {e}")
-            # Still broadcast the update even if room creation fails
+            db.session.rollback()
             record_event(room_id, "code_change", {"message_id": message_id, "length": len(new_code or "")})
-            print(f"[code_change] Emitting code_update to room {room_id} (fallback) with content: {new_code[:30]}...")
-            emit('code_update', {'code_content': new_code, 'message_id': message_id}, to=room_id, include_self=False)
-            print(f"[code_change] Emit completed for room {room_id} (fallback)")
 
 @socketio.on('leave_room')
 def handle_leave_room(data):
@@ -330,7 +438,7 @@ def handle_leave_room(data):
     emit('user_left', {'username': username}, to=room_id)
     
     # Also emit lobby_activated if needed
-    room = Room.query.get(room_id)
+    room = load_room(room_id)
     if room:
         room.problem_id = None
         db.session.commit()
@@ -340,7 +448,7 @@ def handle_leave_room(data):
 def handle_language_change(data):
     room_id = data.get('room_id')
     new_language = data.get('language')
-    room = Room.query.get(room_id)
+    room = load_room(room_id)
     if room:
         room.language = new_language
         db.session.commit()
@@ -355,7 +463,7 @@ def handle_load_problem(data):
     room_id = data.get('room_id')
     problem_id = data.get('problem_id')
 
-    room = Room.query.get(room_id)
+    room = load_room(room_id)
     problem = Problem.query.get(problem_id)
 
     if room and problem:
@@ -363,6 +471,7 @@ def handle_load_problem(data):
         room.problem_id = problem.id
         room.code_content = problem.template_code # Reset code to template
         db.session.commit()
+        queue_code_frame(room_id, room.code_content)
         record_event(room_id, "load_problem", {"problem_id": problem_id})
 
         # Fetch the full room data to send back
@@ -390,7 +499,7 @@ def handle_execute_code(data):
     code_to_run = data.get('code', '') 
     
     # We still get the room to ensure it exists, but we don't need its saved code
-    room = Room.query.get(room_id)
+    room = load_room(room_id)
     if not room:
         return 
 
@@ -411,7 +520,7 @@ def handle_submit_code(data):
     # FIXED: Get the code directly from the data sent by the frontend
     user_code = data.get('code', '')
 
-    room = Room.query.get(room_id)
+    room = load_room(room_id)
     if not room or not room.problem_id:
         emit('submit_result', {'verdict': 'Error', 'details': 'No problem associated with this room.'}, to=room_id)
         return
@@ -426,19 +535,25 @@ def handle_submit_code(data):
     passed_all_tests = True
     for i, test_case in enumerate(problem.test_cases):
         # Pass the test case input as the third argument
-        actual_output, error = run_code(user_code, language, test_case.input_data)
+        actual_output, error = run_code(user_code, language, test_case.input_text)
         if error:
             verdict = "Runtime Error"
             details = f"Test Case #{i+1} failed with an error:\n{error}"
             passed_all_tests = False
             break
-        if actual_output.strip() != test_case.expected_output.strip():
+        accepted, message, checker_error = check_output(problem, test_case, actual_output)
+        if checker_error:
+            verdict = "Error"
+            details = f"The checker failed on Test Case #{i+1}:\n{checker_error}"
+            passed_all_tests = False
+            break
+        if not accepted:
             verdict = "Wrong Answer"
-            details = f"Test Case #{i+1} failed.\nExpected: {test_case.expected_output}\nGot: {actual_output}"
+            details = f"Test Case #{i+1} failed.\n{message}"
             passed_all_tests = False
             break
     if passed_all_tests:
         verdict = "Accepted"
         details = f"Congratulations! You passed all {len(problem.test_cases)} test cases."
-        record_event(room_id, "submit", {"verdict": verdict})
-        emit('submit_result', {'verdict': verdict, 'details': details}, to=room_id)
\ No newline at end of file
+    record_event(room_id, "submit", {"verdict": verdict})
+    emit('submit_result', {'verdict': verdict, 'details': details}, to=room_id)
\ No newline at end of file
@@ -0,0 +1,202 @@
+import hashlib
+import math
+from collections import Counter
+from itertools import zip_longest
+
+from flask import current_app
+from app.code_executor import run_checker
+
+# Comparators work on iterators of text chunks so large expected outputs can be
+# streamed from TestBlob storage instead of being loaded into one string.
+CHUNK_SIZE = 64 * 1024
+PREVIEW_LENGTH = 40
+
+CHECKER_MODES = ('exact', 'lines', 'tokens', 'float', 'unordered', 'custom')
+
+
+def chunk_text(text, chunk_size=CHUNK_SIZE):
+    return (text[i:i + chunk_size] for i in range(0, len(text), chunk_size))
+
+
+def _preview(text):
+    return repr(text[:PREVIEW_LENGTH])
+
+
+def _strip_stream(chunks):
+    """Yields the chunks with leading and trailing whitespace of the whole stream removed."""
+    started = False
+    pending_whitespace = ''
+    for chunk in chunks:
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        stripped = chunk.rstrip()
+        if stripped:
+            yield pending_whitespace + stripped
+            pending_whitespace = chunk[len(stripped):]
+        else:
+            pending_whitespace += chunk
+
+
+def iter_lines(chunks):
+    """Yields lines (without the newline) across chunk boundaries."""
+    tail = ''
+    for chunk in chunks:
+        lines = (tail + chunk).split('\n')
+        tail = lines.pop()
+        yield from lines
+    yield tail
+
+
+def iter_tokens(chunks):
+    """Yields whitespace-separated tokens across chunk boundaries."""
+    tail = ''
+    for chunk in chunks:
+        data = tail + chunk
+        tokens = data.split()
+        # A token touching the end of the chunk may continue in the next one
+        tail = tokens.pop() if tokens and not data[-1].isspace() else ''
+        yield from tokens
+    if tail:
+        yield tail
+
+
+def _without_trailing_blank_lines(lines):
+    """Yields right-stripped lines, dropping blank lines at the end."""
+    blank_run = 0
+    for line in lines:
+        line = line.rstrip()
+        if not line:
+            blank_run += 1
+            continue
+        for _ in range(blank_run):
+            yield ''
+        blank_run = 0
+        yield line
+
+
+def compare_exact(expected, actual):
+    """Same rule as comparing expected.strip() with actual.strip(), without building either string."""
+    expected, actual = _strip_stream(expected), _strip_stream(actual)
+    expected_buf = actual_buf = ''
+    expected_done = actual_done = False
+    offset = 0
+    while True:
+        if not expected_buf and not expected_done:
+            expected_buf = next(expected, None)
+            expected_done = expected_buf is None
+            expected_buf = expected_buf or ''
+            continue
+        if not actual_buf and not actual_done:
+            actual_buf = next(actual, None)
+            actual_done = actual_buf is None
+            actual_buf = actual_buf or ''
+            continue
+        if not expected_buf and not actual_buf:
+            return True, ""
+
+        n = min(len(expected_buf), len(actual_buf))
+        if n == 0 or expected_buf[:n] != actual_buf[:n]:
+            i = 0
+            while i < n and expected_buf[i] == actual_buf[i]:
+                i += 1
+            return False, (f"Output differs at character {offset + i + 1}: "
+                           f"expected {_preview(expected_buf[i:])}, got {_preview(actual_buf[i:])}")
+        offset += n
+        expected_buf, actual_buf = expected_buf[n:], actual_buf[n:]
+
+
+def compare_lines(expected, actual):
+    """Compares line by line, ignoring trailing whitespace on each line and trailing blank lines."""
+    expected_lines = _without_trailing_blank_lines(iter_lines(expected))
+    actual_lines = _without_trailing_blank_lines(iter_lines(actual))
+    for number, (want, got) in enumerate(zip_longest(expected_lines, actual_lines), start=1):
+        if want != got:
+            if got is None:
+                return False, f"Output ended early: line {number} missing, expected {_preview(want)}"
+            if want is None:
+                return False, f"Extra output from line {number}: got {_preview(got)}"
+            return False, f"Line {number} differs: expected {_preview(want)}, got {_preview(got)}"
+    return True, ""
+
+
+def _floats_match(want, got, epsilon):
+    try:
+        a, b = float(want), float(got)
+    except ValueError:
+        return want == got
+    if math.isnan(a) or math.isnan(b):
+        return math.isnan(a) and math.isnan(b)
+    # Absolute or relative error within epsilon
+    return abs(a - b) <= epsilon * max(1.0, abs(a), abs(b))
+
+
+def compare_tokens(expected, actual, epsilon=None):
+    """
+    Compares whitespace-separated tokens. With an epsilon, numeric tokens are
+    accepted if their absolute or relative difference is within it.
+    """
+    pairs = zip_longest(iter_tokens(expected), iter_tokens(actual))
+    for number, (want, got) in enumerate(pairs, start=1):
+        if want == got:
+            continue
+        if got is None:
+            return False, f"Output ended early: token {number} missing, expected {_preview(want)}"
+        if want is None:
+            return False, f"Extra output from token {number}: got {_preview(got)}"
+        if epsilon is None or not _floats_match(want, got, epsilon):
+            return False, f"Token {number} differs: expected {_preview(want)}, got {_preview(got)}"
+    return True, ""
+
+
+def compare_unordered(expected, actual):
+    """
+    Compares the non-blank lines as multisets, so their order does not matter.
+    Lines are counted by SHA-256 digest to keep memory per line fixed.
+    """
+    counts = Counter()
+    for line in iter_lines(expected):
+        line = line.rstrip()
+        if line:
+            counts[hashlib.sha256(line.encode('utf-8')).digest()] += 1
+    for line in iter_lines(actual):
+        line = line.rstrip()
+        if not line:
+            continue
+        key = hashlib.sha256(line.encode('utf-8')).digest()
+        if not counts[key]:
+            return False, f"Unexpected line in output: {_preview(line)}"
+        counts[key] -= 1
+    missing = sum(counts.values())
+    if missing:
+        return False, f"Output is missing {missing} expected line(s)"
+    return True, ""
+
+
+def check_output(problem, test_case, actual_output):
+    """
+    Judges one test case's output according to the problem's checker mode.
+    Returns (accepted, message, error); error is set if a custom checker failed to run.
+    """
+    mode = problem.checker_mode or 'exact'
+    expected = test_case.iter_expected_output(CHUNK_SIZE)
+    actual = chunk_text(actual_output)
+
+    if mode == 'custom':
+        return run_checker(problem.checker_code or '', test_case.input_text, expected, actual_output)
+    if mode == 'lines':
+        accepted, message = compare_lines(expected, actual)
+    elif mode == 'tokens':
+        accepted, message = compare_tokens(expected, actual)
+    elif mode == 'float':
+        epsilon = problem.checker_epsilon
+        if epsilon is None:
+            epsilon = current_app.config.get('CHECKER_DEFAULT_EPSILON', 1e-6)
+        accepted, message = compare_tokens(expected, actual, epsilon)
+    elif mode == 'unordered':
+        accepted, message = compare_unordered(expected, actual)
+    else:
+        accepted, message = compare_exact(expected, actual)
+    return accepted, message, ""
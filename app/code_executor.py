@@ -1,10 +1,21 @@
 import docker
 import base64
+import json
+import os
+import shutil
+import tempfile
+
+# Limits for custom checker containers
+CHECKER_TIMEOUT_SECONDS = 10
+CHECKER_MEMORY_LIMIT = "256m"
+CHECKER_PIDS_LIMIT = 64
 
 def run_code(user_code, language, test_input_args=""):
     """
     Runs code in a secure Docker container using Base64 encoding to prevent
-    syntax errors with complex code strings.
+    syntax errors with complex code strings. Test case arguments are passed as
+    a read-only file instead of being inlined, so large inputs don't overflow
+    the command line.
     """
     client = docker.from_env()
     
@@ -20,7 +31,9 @@ def run_code(user_code, language, test_input_args=""):
 
 # Call the function with the specific test case arguments and print the result
 try:
-    result = solve({test_input_args})
+    with open('/data/args', encoding='utf-8') as _args_file:
+        _args = _args_file.read()
+    result = eval("solve(" + _args + ")")
     print(result)
 except Exception as e:
     import sys
@@ -48,6 +61,14 @@ except Exception as e:
     else:
         return "", "Unsupported language"
 
+    data_dir = None
+    volumes = {}
+    if test_input_args:
+        data_dir = tempfile.mkdtemp(prefix="codecollab-run-")
+        with open(os.path.join(data_dir, 'args'), 'w', encoding='utf-8') as f:
+            f.write(test_input_args)
+        volumes = {data_dir: {'bind': '/data', 'mode': 'ro'}}
+
     try:
         container = client.containers.run(
             image_name,
@@ -55,6 +76,7 @@ except Exception as e:
             detach=False,
             remove=True,
             network_disabled=True,
+            volumes=volumes,
         )
         output = container.decode('utf-8').strip()
         return output, ""
@@ -71,4 +93,93 @@ except Exception as e:
         except Exception as pull_error:
             return "", f"Failed to pull Docker image: {pull_error}"
     except Exception as e:
-        return "", str(e)
\ No newline at end of file
+        return "", str(e)
+    finally:
+        if data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+def run_checker(checker_code, input_data, expected_chunks, actual_output):
+    """
+    Runs a problem's custom Python checker in a Docker container. The checker
+    must define `check(input_data, expected_output, actual_output)` returning a
+    bool or a (bool, message) tuple. Test data is passed as read-only files
+    rather than on the command line so large outputs fit, and the verdict is
+    written to its own file so anything the checker prints can't change it.
+    The container is killed if it runs longer than CHECKER_TIMEOUT_SECONDS.
+    Returns (accepted, message, error).
+    """
+    client = docker.from_env()
+    image_name = "python:3.9-slim"
+
+    full_script = f"""
+# Problem's checker definition
+{checker_code}
+
+def _read(name):
+    with open('/data/' + name, encoding='utf-8') as f:
+        return f.read()
+
+result = check(_read('input'), _read('expected'), _read('actual'))
+accepted, message = result if isinstance(result, tuple) else (result, "")
+import json as _json
+with open('/result/verdict.json', 'w', encoding='utf-8') as _f:
+    _json.dump({{'accepted': bool(accepted), 'message': str(message)}}, _f)
+"""
+    encoded_script = base64.b64encode(full_script.encode('utf-8')).decode('utf-8')
+    command = f"/bin/sh -c \"echo {encoded_script} | base64 -d | python\""
+
+    data_dir = tempfile.mkdtemp(prefix="codecollab-checker-")
+    result_dir = tempfile.mkdtemp(prefix="codecollab-verdict-")
+    # The container may run as a different user than the server
+    os.chmod(result_dir, 0o777)
+    container = None
+    try:
+        with open(os.path.join(data_dir, 'input'), 'w', encoding='utf-8') as f:
+            f.write(input_data)
+        with open(os.path.join(data_dir, 'expected'), 'w', encoding='utf-8') as f:
+            for chunk in expected_chunks:
+                f.write(chunk)
+        with open(os.path.join(data_dir, 'actual'), 'w', encoding='utf-8') as f:
+            f.write(actual_output)
+
+        container = client.containers.run(
+            image_name,
+            command,
+            detach=True,
+            network_disabled=True,
+            mem_limit=CHECKER_MEMORY_LIMIT,
+            pids_limit=CHECKER_PIDS_LIMIT,
+            volumes={
+                data_dir: {'bind': '/data', 'mode': 'ro'},
+                result_dir: {'bind': '/result', 'mode': 'rw'},
+            },
+        )
+        try:
+            status = container.wait(timeout=CHECKER_TIMEOUT_SECONDS)
+        except Exception:
+            # The checker hung: kill it rather than blocking the submission
+            try:
+                container.kill()
+            except Exception:
+                pass
+            return False, "", f"Checker timed out after {CHECKER_TIMEOUT_SECONDS} seconds"
+
+        if status.get('StatusCode', 1) != 0:
+            return False, "", container.logs(stdout=False, stderr=True).decode('utf-8').strip() \
+                or f"Checker exited with status {status.get('StatusCode')}"
+        try:
+            with open(os.path.join(result_dir, 'verdict.json'), encoding='utf-8') as f:
+                verdict = json.load(f)
+        except (OSError, ValueError):
+            return False, "", "Checker did not report a verdict"
+        return verdict.get('accepted') is True, str(verdict.get('message', '')).strip(), ""
+    except Exception as e:
+        return False, "", str(e)
+    finally:
+        if container is not None:
+            try:
+                container.remove(force=True)
+            except Exception:
+                pass
+        shutil.rmtree(data_dir, ignore_errors=True)
+        shutil.rmtree(result_dir, ignore_errors=True)
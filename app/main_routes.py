@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template
 from app.models import Room
+from app.room_lifecycle import load_room
 import uuid
 
 # Create a Blueprint for main, user-facing routes
@@ -10,8 +11,8 @@ def generate_room_id():
 
 @bp.route('/room/<string:room_id>')
 def room_page(room_id):
-    # Check if the room exists in the database
-    room = Room.query.get(room_id)
+    # Check if the room exists in the database (restoring it if it was archived)
+    room = load_room(room_id)
     if not room:
         # Create a new room if it doesn't exist (for direct URL access)
         new_room = Room(id=room_id, created_by=None)  # No user association for direct access
@@ -1,5 +1,7 @@
+import codecs
+import zlib
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.passwords import hash_password, verify_password, needs_rehash
 from sqlalchemy import JSON, func
 from sqlalchemy.sql import expression
 
@@ -9,10 +11,13 @@ class User(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
 
 class Room(db.Model):
     id = db.Column(db.String(10), primary_key=True)
@@ -20,6 +25,7 @@ class Room(db.Model):
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     problem_id = db.Column(db.Integer, db.ForeignKey('problem.id'), nullable=True)
     language = db.Column(db.String(20), nullable=False, default='python')
+    last_active_at = db.Column(db.DateTime(timezone=True), nullable=False, default=func.now(), server_default=func.now(), index=True)
 
 class Problem(db.Model):
     """Represents a coding problem."""
@@ -27,8 +33,38 @@ class Problem(db.Model):
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False) 
     template_code = db.Column(db.Text, nullable=True)
+    # Set for problems loaded by the bulk importer, used to upsert and skip unchanged packages
+    slug = db.Column(db.String(200), unique=True, nullable=True)
+    content_hash = db.Column(db.String(64), nullable=True)
+    tests_hash = db.Column(db.String(64), nullable=True)
+    test_set_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # How outputs are judged: exact, lines, tokens, float, unordered or custom (see app/checkers.py)
+    checker_mode = db.Column(db.String(20), nullable=False, default='exact', server_default='exact')
+    checker_epsilon = db.Column(db.Float, nullable=True)
+    checker_code = db.Column(db.Text, nullable=True)
     test_cases = db.relationship('TestCase', backref='problem', lazy=True, cascade="all, delete-orphan")
 
+class TestBlob(db.Model):
+    """Large test data stored out of line, compressed and keyed by its SHA-256 so it is deduplicated."""
+    hash = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+
+    def text(self):
+        return zlib.decompress(self.data).decode('utf-8')
+
+    def iter_text(self, chunk_size=64 * 1024):
+        """Yields the decompressed text in chunks without materialising all of it."""
+        decompressor = zlib.decompressobj()
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for start in range(0, len(self.data), chunk_size):
+            # Cap the output per step so highly compressible data stays chunked
+            pending = self.data[start:start + chunk_size]
+            while pending:
+                yield decoder.decode(decompressor.decompress(pending, chunk_size))
+                pending = decompressor.unconsumed_tail
+        yield decoder.decode(decompressor.flush(), final=True)
+
 class TestCase(db.Model):
     """Represents a single test case for a Problem."""
     id = db.Column(db.Integer, primary_key=True)
@@ -36,10 +72,58 @@ class TestCase(db.Model):
     expected_output = db.Column(db.Text, nullable=False)
     is_hidden = db.Column(db.Boolean, default=True, nullable=False)
     problem_id = db.Column(db.Integer, db.ForeignKey('problem.id'), nullable=False)
+    # When set, the data lives in TestBlob and the inline column is empty
+    input_blob_hash = db.Column(db.String(64), db.ForeignKey('test_blob.hash'), nullable=True)
+    output_blob_hash = db.Column(db.String(64), db.ForeignKey('test_blob.hash'), nullable=True)
+    input_blob = db.relationship('TestBlob', foreign_keys=[input_blob_hash])
+    output_blob = db.relationship('TestBlob', foreign_keys=[output_blob_hash])
+
+    @property
+    def input_text(self):
+        return self.input_blob.text() if self.input_blob_hash else self.input_data
+
+    @property
+    def expected_output_text(self):
+        return self.output_blob.text() if self.output_blob_hash else self.expected_output
+
+    def iter_expected_output(self, chunk_size=64 * 1024):
+        if self.output_blob_hash:
+            return self.output_blob.iter_text(chunk_size)
+        text = self.expected_output
+        return (text[i:i + chunk_size] for i in range(0, len(text), chunk_size))
 
 class SessionEvent(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     room_id = db.Column(db.String(10), db.ForeignKey('room.id'), nullable=False, index=True)
     event_type = db.Column(db.String(32), nullable=False)
     payload = db.Column(JSON,nullable=False,default=dict)
-    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
\ No newline at end of file
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
+
+class HistoryFrame(db.Model):
+    """
+    One point in a room's code history. Snapshot frames hold the full
+    (compressed) code, delta frames hold a compressed diff against the
+    previous frame.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    room_id = db.Column(db.String(10), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    is_snapshot = db.Column(db.Boolean, nullable=False, default=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('room_id', 'seq', name='uq_history_frame_room_seq'),
+        db.Index('ix_history_frame_room_created', 'room_id', 'created_at'),
+    )
+
+
+class RoomArchive(db.Model):
+    """
+    Cold storage for an idle room. `data` is a zlib-compressed JSON document
+    holding the room's final state, its session events and its code history.
+    """
+    room_id = db.Column(db.String(10), primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+    archived_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=func.now())
\ No newline at end of file
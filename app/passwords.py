@@ -0,0 +1,68 @@
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Password hashing is CPU bound, so it runs in a small process pool instead of
+# on the threads that serve HTTP and socket traffic.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = current_app.config.get('PASSWORD_HASH_WORKERS', 2)
+            # Forking a multi-threaded server is unsafe, so workers come from a
+            # forkserver, or are spawned where that isn't available (e.g. Windows)
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def _run(func, *args):
+    """Runs func in the hashing pool, falling back to the current thread if the pool died."""
+    try:
+        return _get_executor().submit(func, *args).result()
+    except BrokenProcessPool:
+        _reset_executor()
+        return func(*args)
+
+
+def hash_method():
+    """Returns the configured Werkzeug hash method, e.g. 'scrypt:32768:8:1'."""
+    return current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, hash_method())
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+@functools.lru_cache(maxsize=None)
+def _stored_method(method):
+    """
+    The method prefix Werkzeug actually stores for `method`; short forms are
+    expanded, e.g. 'pbkdf2:sha256' -> 'pbkdf2:sha256:1000000'. Computed once
+    per method, in the hashing pool.
+    """
+    return _run(generate_password_hash, '', method).split('$', 1)[0]
+
+
+def needs_rehash(password_hash):
+    """True if the stored hash was made with different work-factor settings than configured."""
+    return password_hash.split('$', 1)[0] != _stored_method(hash_method())
@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import zlib
+
+from flask import current_app
+from sqlalchemy import insert
+from app import db
+from app.models import Problem, TestCase, TestBlob
+from app.checkers import CHECKER_MODES
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _prepare_data(read_chunks, inline_limit):
+    """
+    Hashes test data as it streams in. Data up to inline_limit bytes is kept
+    as text for the TestCase row. Larger data only keeps its hash and a way to
+    read it again, so it is compressed later, and only if no TestBlob with
+    that hash exists yet.
+    """
+    digest = hashlib.sha256()
+    raw = []
+    size = 0
+    for chunk in read_chunks():
+        digest.update(chunk)
+        size += len(chunk)
+        if raw is not None:
+            raw.append(chunk)
+            if size > inline_limit:
+                raw = None
+
+    inline = raw is not None
+    return {
+        'hash': digest.hexdigest(),
+        'size': size,
+        'text': b''.join(raw).decode('utf-8') if inline else None,
+        'read_chunks': None if inline else read_chunks,
+    }
+
+
+def _compress(read_chunks):
+    compressor = zlib.compressobj()
+    compressed = [compressor.compress(chunk) for chunk in read_chunks()]
+    compressed.append(compressor.flush())
+    return b''.join(compressed)
+
+
+def _file_reader(path):
+    """Returns a callable that streams the file's bytes, so it can be read more than once."""
+    def read_chunks():
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+    return read_chunks
+
+
+def _text_reader(text):
+    data = text.encode('utf-8')
+    return lambda: [data]
+
+
+def _finish_package(meta, tests):
+    """Adds the content hashes used to skip unchanged packages and to version test sets."""
+    test_keys = [[t['input']['hash'], t['output']['hash'], t['is_hidden']] for t in tests]
+    tests_hash = hashlib.sha256(json.dumps(test_keys).encode('utf-8')).hexdigest()
+    content = json.dumps({'meta': meta, 'tests_hash': tests_hash}, sort_keys=True)
+    return dict(meta,
+                tests=tests,
+                tests_hash=tests_hash,
+                content_hash=hashlib.sha256(content.encode('utf-8')).hexdigest())
+
+
+def _meta(data, default_slug=None):
+    slug = data.get('slug') or default_slug
+    if not slug or not data.get('title') or data.get('description') is None:
+        raise ValueError(f"Problem package {slug or '?'} needs slug, title and description")
+    checker = data.get('checker') or ('custom' if data.get('checker_code') else 'exact')
+    if checker not in CHECKER_MODES:
+        raise ValueError(f"Problem package {slug} has unknown checker {checker!r}")
+    return {
+        'slug': slug,
+        'title': data['title'],
+        'description': data['description'],
+        'template_code': data.get('template_code'),
+        'checker_mode': checker,
+        'checker_epsilon': data.get('checker_epsilon'),
+        'checker_code': data.get('checker_code'),
+    }
+
+
+def read_jsonl(path, inline_limit):
+    """
+    Yields problem packages from a JSONL file, one problem per line:
+    {"slug", "title", "description", "template_code",
+     "checker", "checker_epsilon", "checker_code",
+     "test_cases": [{"input", "output", "hidden"}]}
+    """
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            tests = [
+                {
+                    'input': _prepare_data(_text_reader(tc['input']), inline_limit),
+                    'output': _prepare_data(_text_reader(tc['output']), inline_limit),
+                    'is_hidden': bool(tc.get('hidden', True)),
+                }
+                for tc in data.get('test_cases', [])
+            ]
+            yield _finish_package(_meta(data), tests)
+
+
+def read_directory(path, inline_limit):
+    """
+    Yields problem packages from a directory with one sub-directory per
+    problem, each holding problem.json and tests/<name>.in + tests/<name>.out.
+    Tests listed in problem.json's "visible_tests" are not hidden. An optional
+    checker.py is used as the problem's custom checker. The directory name is
+    the default slug.
+    """
+    for name in sorted(os.listdir(path)):
+        package_dir = os.path.join(path, name)
+        meta_path = os.path.join(package_dir, 'problem.json')
+        if not os.path.isfile(meta_path):
+            continue
+        with open(meta_path, encoding='utf-8') as f:
+            data = json.load(f)
+        checker_path = os.path.join(package_dir, 'checker.py')
+        if os.path.isfile(checker_path):
+            with open(checker_path, encoding='utf-8') as f:
+                data['checker_code'] = f.read()
+
+        visible = set(data.get('visible_tests', []))
+        tests_dir = os.path.join(package_dir, 'tests')
+        tests = []
+        if os.path.isdir(tests_dir):
+            for test_file in sorted(os.listdir(tests_dir)):
+                test_name, ext = os.path.splitext(test_file)
+                out_path = os.path.join(tests_dir, test_name + '.out')
+                if ext != '.in' or not os.path.isfile(out_path):
+                    continue
+                tests.append({
+                    'input': _prepare_data(_file_reader(os.path.join(tests_dir, test_file)), inline_limit),
+                    'output': _prepare_data(_file_reader(out_path), inline_limit),
+                    'is_hidden': test_name not in visible,
+                })
+        yield _finish_package(_meta(data, default_slug=name), tests)
+
+
+def _store_blobs(packages):
+    """
+    Inserts the out-of-line test data that is not stored yet. Each new blob
+    is compressed and written on its own, so only one is held in memory.
+    """
+    blobs = {}
+    for package in packages:
+        for test in package['tests']:
+            for data in (test['input'], test['output']):
+                if data['text'] is None:
+                    blobs[data['hash']] = data
+    if not blobs:
+        return 0
+    known = {h for (h,) in db.session.query(TestBlob.hash).filter(TestBlob.hash.in_(list(blobs)))}
+    stored = 0
+    for h, data in blobs.items():
+        if h in known:
+            continue
+        db.session.execute(insert(TestBlob), [{'hash': h, 'data': _compress(data['read_chunks']), 'size': data['size']}])
+        stored += 1
+    return stored
+
+
+def _remove_orphan_blobs(hashes):
+    """Deletes the given blobs that no test case references any more."""
+    if not hashes:
+        return 0
+    in_use = db.session.query(TestCase.input_blob_hash).filter(TestCase.input_blob_hash.in_(hashes)).union(
+        db.session.query(TestCase.output_blob_hash).filter(TestCase.output_blob_hash.in_(hashes)))
+    orphans = hashes - {h for (h,) in in_use}
+    if not orphans:
+        return 0
+    return TestBlob.query.filter(TestBlob.hash.in_(orphans)).delete(synchronize_session=False)
+
+
+def _test_case_row(problem_id, test):
+    return {
+        'problem_id': problem_id,
+        'is_hidden': test['is_hidden'],
+        'input_data': test['input']['text'] or '',
+        'expected_output': test['output']['text'] or '',
+        'input_blob_hash': None if test['input']['text'] is not None else test['input']['hash'],
+        'output_blob_hash': None if test['output']['text'] is not None else test['output']['hash'],
+    }
+
+
+def _import_batch(packages, stats):
+    """Upserts one batch of packages in a single transaction."""
+    # A slug appearing twice in a batch keeps its last version
+    packages = list({package['slug']: package for package in packages}.values())
+    existing = {p.slug: p for p in Problem.query.filter(Problem.slug.in_([p['slug'] for p in packages]))}
+
+    changed = [p for p in packages if p['slug'] not in existing
+               or existing[p['slug']].content_hash != p['content_hash']]
+    stats['skipped'] += len(packages) - len(changed)
+    if not changed:
+        return
+
+    stats['blobs_stored'] += _store_blobs(changed)
+
+    retest = []
+    for package in changed:
+        problem = existing.get(package['slug'])
+        if problem is None:
+            problem = Problem()
+            problem.slug = package['slug']
+            problem.test_set_version = 1
+            db.session.add(problem)
+            stats['created'] += 1
+        else:
+            stats['updated'] += 1
+            if problem.tests_hash != package['tests_hash']:
+                problem.test_set_version = (problem.test_set_version or 1) + 1
+
+        problem.title = package['title']
+        problem.description = package['description']
+        problem.template_code = package['template_code']
+        problem.checker_mode = package['checker_mode']
+        problem.checker_epsilon = package['checker_epsilon']
+        problem.checker_code = package['checker_code']
+        problem.content_hash = package['content_hash']
+        if problem.tests_hash != package['tests_hash']:
+            problem.tests_hash = package['tests_hash']
+            retest.append((problem, package['tests']))
+
+    # Assigns ids to new problems
+    db.session.flush()
+    stale_ids = [problem.id for problem, _ in retest]
+    stale_blobs = set()
+    if stale_ids:
+        stale_cases = TestCase.query.filter(TestCase.problem_id.in_(stale_ids))
+        for input_hash, output_hash in stale_cases.with_entities(TestCase.input_blob_hash, TestCase.output_blob_hash):
+            stale_blobs.update(h for h in (input_hash, output_hash) if h)
+        stale_cases.delete(synchronize_session=False)
+    rows = [_test_case_row(problem.id, test) for problem, tests in retest for test in tests]
+    if rows:
+        db.session.execute(insert(TestCase), rows)
+    stats['test_cases'] += len(rows)
+    stats['blobs_removed'] += _remove_orphan_blobs(stale_blobs)
+    db.session.commit()
+
+
+def import_problems(source, batch_size=None):
+    """
+    Imports problem packages from a JSONL file or a package directory.
+
+    Problems are matched by slug and upserted batch by batch. Packages whose
+    content hash is unchanged are skipped, so an interrupted import can simply
+    be run again and picks up where the last committed batch ended. A
+    problem's test_set_version is bumped whenever its test cases change.
+    """
+    batch_size = batch_size or current_app.config.get('IMPORT_BATCH_SIZE', 100)
+    inline_limit = current_app.config.get('TEST_DATA_INLINE_LIMIT', 64 * 1024)
+    if os.path.isdir(source):
+        packages = read_directory(source, inline_limit)
+    else:
+        packages = read_jsonl(source, inline_limit)
+
+    stats = {'created': 0, 'updated': 0, 'skipped': 0, 'test_cases': 0, 'blobs_stored': 0, 'blobs_removed': 0}
+    batch = []
+    for package in packages:
+        batch.append(package)
+        if len(batch) >= batch_size:
+            _import_batch(batch, stats)
+            batch = []
+    if batch:
+        _import_batch(batch, stats)
+    return stats
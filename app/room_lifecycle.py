@@ -0,0 +1,241 @@
+import base64
+import json
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db, socketio
+from app.models import Room, SessionEvent, HistoryFrame, RoomArchive
+from app.session_history import forget_room
+
+# Running totals for the archival job, reported by /api/admin/lifecycle
+lifecycle_stats = {
+    'runs': 0,
+    'rooms_archived': 0,
+    'rooms_restored': 0,
+    'events_archived': 0,
+    'bytes_archived': 0,
+    'archive_seconds': 0.0,
+    'last_run_at': None,
+}
+
+_manager_started = False
+_manager_lock = threading.Lock()
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def archive_room(room_id):
+    """
+    Moves a room, its session events and its code history into a single
+    compressed RoomArchive row and deletes the hot rows. Returns the number of
+    compressed bytes written, or None if the room does not exist.
+    """
+    room = Room.query.get(room_id)
+    if not room:
+        return None
+
+    events = SessionEvent.query.filter_by(room_id=room_id).order_by(SessionEvent.id).all()
+    frames = HistoryFrame.query.filter_by(room_id=room_id).order_by(HistoryFrame.seq).all()
+    document = {
+        'room': {
+            'id': room.id,
+            'code_content': room.code_content,
+            'created_by': room.created_by,
+            'problem_id': room.problem_id,
+            'language': room.language,
+            'last_active_at': _isoformat(room.last_active_at),
+        },
+        'events': [
+            {
+                'event_type': event.event_type,
+                'payload': event.payload,
+                'created_at': _isoformat(event.created_at),
+            }
+            for event in events
+        ],
+        'history': [
+            {
+                'seq': frame.seq,
+                'is_snapshot': frame.is_snapshot,
+                'data': base64.b64encode(frame.data).decode('ascii'),
+                'created_at': _isoformat(frame.created_at),
+            }
+            for frame in frames
+        ],
+    }
+    data = zlib.compress(json.dumps(document, separators=(',', ':')).encode('utf-8'), 9)
+
+    archive = RoomArchive.query.get(room_id) or RoomArchive(room_id=room_id)
+    archive.data = data
+    archive.event_count = len(events)
+    archive.archived_at = datetime.now(timezone.utc)
+    db.session.add(archive)
+
+    HistoryFrame.query.filter_by(room_id=room_id).delete(synchronize_session=False)
+    SessionEvent.query.filter_by(room_id=room_id).delete(synchronize_session=False)
+    db.session.delete(room)
+    db.session.commit()
+    forget_room(room_id)
+
+    lifecycle_stats['rooms_archived'] += 1
+    lifecycle_stats['events_archived'] += len(events)
+    lifecycle_stats['bytes_archived'] += len(data)
+    return len(data)
+
+
+def restore_room(room_id):
+    """Recreates an archived room and its history. Returns the Room, or None if there is no archive."""
+    archive = RoomArchive.query.get(room_id)
+    if not archive:
+        return None
+
+    document = json.loads(zlib.decompress(archive.data).decode('utf-8'))
+    saved = document['room']
+    room = Room()
+    room.id = saved['id']
+    room.code_content = saved['code_content']
+    room.created_by = saved['created_by']
+    room.problem_id = saved['problem_id']
+    room.language = saved['language']
+    room.last_active_at = datetime.now(timezone.utc)
+    db.session.add(room)
+    try:
+        # The room row must exist before events that reference it
+        db.session.flush()
+    except IntegrityError:
+        # Another request restored this room first
+        db.session.rollback()
+        return Room.query.get(room_id)
+
+    events = []
+    for saved_event in document['events']:
+        event = SessionEvent()
+        event.room_id = room_id
+        event.event_type = saved_event['event_type']
+        event.payload = saved_event['payload']
+        event.created_at = _parse_datetime(saved_event['created_at'])
+        events.append(event)
+    frames = []
+    for saved_frame in document['history']:
+        frame = HistoryFrame()
+        frame.room_id = room_id
+        frame.seq = saved_frame['seq']
+        frame.is_snapshot = saved_frame['is_snapshot']
+        frame.data = base64.b64decode(saved_frame['data'])
+        frame.created_at = _parse_datetime(saved_frame['created_at'])
+        frames.append(frame)
+    db.session.add_all(events)
+    db.session.add_all(frames)
+    db.session.delete(archive)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return Room.query.get(room_id)
+
+    lifecycle_stats['rooms_restored'] += 1
+    return room
+
+
+def load_room(room_id):
+    """Returns the room with this id, lazily restoring it from the archive if needed."""
+    room = Room.query.get(room_id)
+    if room:
+        return room
+    # If a concurrent restore finished between the two lookups, the archive is
+    # gone but the room exists now
+    return restore_room(room_id) or Room.query.get(room_id)
+
+
+def touch_room(room_id):
+    """Marks a room as active now. Does not commit."""
+    Room.query.filter_by(id=str(room_id)).update(
+        {'last_active_at': datetime.now(timezone.utc)}, synchronize_session=False
+    )
+
+
+def archive_idle_rooms():
+    """
+    Archives up to ROOM_ARCHIVE_BATCH_SIZE rooms that have been idle longer
+    than ROOM_IDLE_MINUTES and have nobody connected. Returns the number archived.
+    """
+    # Imported here to avoid a circular import with the routes module
+    from app.api_routes import active_users
+
+    idle_minutes = current_app.config.get('ROOM_IDLE_MINUTES', 7 * 24 * 60)
+    batch_size = current_app.config.get('ROOM_ARCHIVE_BATCH_SIZE', 50)
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=idle_minutes)
+
+    started = time.monotonic()
+    # Occupied rooms are excluded in SQL so they can't fill the batch every pass
+    occupied = [room_id for room_id, users in active_users.items() if users]
+    query = db.session.query(Room.id).filter(Room.last_active_at < cutoff)
+    if occupied:
+        query = query.filter(Room.id.notin_(occupied))
+    candidates = query.order_by(Room.last_active_at).limit(batch_size).all()
+    archived = 0
+    for (room_id,) in candidates:
+        try:
+            if archive_room(room_id) is not None:
+                archived += 1
+        except Exception as e:
+            db.session.rollback()
+            print(f"[lifecycle] Failed to archive room {room_id}: {e}")
+
+    lifecycle_stats['runs'] += 1
+    lifecycle_stats['archive_seconds'] += time.monotonic() - started
+    lifecycle_stats['last_run_at'] = datetime.now(timezone.utc).isoformat()
+    return archived
+
+
+def table_sizes():
+    """Row counts of the hot and cold room tables."""
+    return {
+        'room': db.session.query(Room).count(),
+        'session_event': db.session.query(SessionEvent).count(),
+        'history_frame': db.session.query(HistoryFrame).count(),
+        'room_archive': db.session.query(RoomArchive).count(),
+        'room_archive_bytes': db.session.query(db.func.coalesce(db.func.sum(db.func.length(RoomArchive.data)), 0)).scalar(),
+    }
+
+
+def lifecycle_report():
+    report = dict(lifecycle_stats)
+    seconds = report['archive_seconds']
+    report['rooms_per_second'] = round(report['rooms_archived'] / seconds, 2) if seconds else None
+    report['tables'] = table_sizes()
+    return report
+
+
+def _lifecycle_loop(app):
+    interval = app.config.get('ROOM_LIFECYCLE_INTERVAL_SECONDS', 300)
+    while True:
+        socketio.sleep(interval)
+        with app.app_context():
+            try:
+                archived = archive_idle_rooms()
+                if archived:
+                    print(f"[lifecycle] Archived {archived} idle rooms")
+            except Exception as e:
+                db.session.rollback()
+                print(f"[lifecycle] Archival pass failed: {e}")
+
+
+def start_lifecycle_manager(app):
+    """Starts the background task that archives idle rooms, once per process."""
+    global _manager_started
+    with _manager_lock:
+        if _manager_started:
+            return
+        _manager_started = True
+    socketio.start_background_task(_lifecycle_loop, app)
@@ -0,0 +1,81 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import AddConstraint, CreateColumn
+from app import db
+from app.models import Room, Problem, TestCase
+
+# Columns added to tables that already existed. db.create_all() creates new
+# tables but never alters existing ones, so these are added by upgrade_schema.
+ADDED_COLUMNS = [
+    Room.__table__.c.last_active_at,
+    Problem.__table__.c.slug,
+    Problem.__table__.c.content_hash,
+    Problem.__table__.c.tests_hash,
+    Problem.__table__.c.test_set_version,
+    Problem.__table__.c.checker_mode,
+    Problem.__table__.c.checker_epsilon,
+    Problem.__table__.c.checker_code,
+    TestCase.__table__.c.input_blob_hash,
+    TestCase.__table__.c.output_blob_hash,
+]
+
+# Indexes for the added columns: (name, table, column, unique)
+ADDED_INDEXES = [
+    ('ix_room_last_active_at', 'room', 'last_active_at', False),
+    ('uq_problem_slug', 'problem', 'slug', True),
+]
+
+
+def _add_column_statements(column, dialect):
+    table = column.table.name
+    if dialect.name == 'sqlite' and column.server_default is not None \
+            and not isinstance(column.server_default.arg, str):
+        # SQLite can't add a column with a non-constant default such as
+        # now(), so the column is added nullable and filled in
+        return [
+            f"ALTER TABLE {table} ADD COLUMN {column.name} {column.type.compile(dialect)}",
+            f"UPDATE {table} SET {column.name} = CURRENT_TIMESTAMP",
+        ]
+    statements = [f"ALTER TABLE {table} ADD COLUMN {CreateColumn(column).compile(dialect=dialect)}"]
+    # SQLite can't add constraints to an existing table
+    if dialect.name != 'sqlite':
+        statements += [str(AddConstraint(fk.constraint).compile(dialect=dialect)) for fk in column.foreign_keys]
+    return statements
+
+
+def pending_statements():
+    """Returns the SQL that brings an existing database up to the current models."""
+    inspector = inspect(db.engine)
+    dialect = db.engine.dialect
+    # Missing tables are created whole by db.create_all()
+    tables = set(inspector.get_table_names())
+    statements = []
+    for column in ADDED_COLUMNS:
+        if column.table.name not in tables:
+            continue
+        existing = {c['name'] for c in inspector.get_columns(column.table.name)}
+        if column.name not in existing:
+            statements += _add_column_statements(column, dialect)
+
+    for name, table, column, unique in ADDED_INDEXES:
+        if table not in tables:
+            continue
+        indexed = {tuple(ix['column_names']) for ix in inspector.get_indexes(table)}
+        if unique:
+            indexed |= {tuple(uq['column_names']) for uq in inspector.get_unique_constraints(table)}
+        if (column,) not in indexed:
+            statements.append(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({column})")
+    return statements
+
+
+def upgrade_schema():
+    """
+    Creates missing tables and adds the columns and indexes that
+    db.create_all() can't add to existing tables. Safe to run more than once.
+    Returns the statements that were run.
+    """
+    db.create_all()
+    statements = pending_statements()
+    with db.engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+    return statements
@@ -0,0 +1,309 @@
+import json
+import queue
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db, socketio
+from app.models import HistoryFrame
+
+# Least recently used cache of the last recorded frame per room so new diffs
+# don't need a DB read. Format: {room_id: (seq, code_content)}
+_last_frames = OrderedDict()
+_history_lock = threading.Lock()
+
+# Latest unwritten code per room, and the rooms waiting for the history writer
+# task in arrival order. A room is queued once however many keystrokes arrive
+# before it is written, so memory stays bounded by the number of rooms.
+_pending_code = {}
+_pending_rooms = queue.Queue()
+_pending_lock = threading.Lock()
+_writer_started = False
+_writer_lock = threading.Lock()
+
+
+def _encode_snapshot(text):
+    return zlib.compress(text.encode('utf-8'))
+
+
+def _encode_delta(old_text, new_text):
+    """
+    Encodes the change from old_text to new_text as a compressed list of
+    [start, end, replacement] edits against old_text. Live edits touch one
+    region, so the common prefix and suffix are trimmed in linear time and the
+    changed middle is stored as a single replacement.
+    """
+    limit = min(len(old_text), len(new_text))
+    prefix = 0
+    while prefix < limit and old_text[prefix] == new_text[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old_text[-1 - suffix] == new_text[-1 - suffix]:
+        suffix += 1
+    ops = [[prefix, len(old_text) - suffix, new_text[prefix:len(new_text) - suffix]]]
+    return zlib.compress(json.dumps(ops, separators=(',', ':')).encode('utf-8'))
+
+
+def _apply_frame(frame, text):
+    """Returns the code content after applying a frame to the previous content."""
+    raw = zlib.decompress(frame.data).decode('utf-8')
+    if frame.is_snapshot:
+        return raw
+    pieces = []
+    cursor = 0
+    for start, end, replacement in json.loads(raw):
+        pieces.append(text[cursor:start])
+        pieces.append(replacement)
+        cursor = end
+    pieces.append(text[cursor:])
+    return ''.join(pieces)
+
+
+def _reconstruct(room_id, target_seq):
+    """
+    Rebuilds the code at target_seq from the nearest snapshot at or before it.
+    Snapshots are taken every HISTORY_SNAPSHOT_INTERVAL frames, so this touches
+    a bounded number of rows.
+    """
+    snapshot = HistoryFrame.query.filter(
+        HistoryFrame.room_id == room_id,
+        HistoryFrame.is_snapshot.is_(True),
+        HistoryFrame.seq <= target_seq,
+    ).order_by(HistoryFrame.seq.desc()).first()
+    if not snapshot:
+        return None
+
+    text = _apply_frame(snapshot, '')
+    deltas = HistoryFrame.query.filter(
+        HistoryFrame.room_id == room_id,
+        HistoryFrame.seq > snapshot.seq,
+        HistoryFrame.seq <= target_seq,
+    ).order_by(HistoryFrame.seq)
+    for frame in deltas:
+        text = _apply_frame(frame, text)
+    return text
+
+
+def _cache_frame(room_id, seq, code_content):
+    _last_frames[room_id] = (seq, code_content)
+    _last_frames.move_to_end(room_id)
+    limit = current_app.config.get('HISTORY_CACHED_ROOMS', 1000)
+    while len(_last_frames) > limit:
+        _last_frames.popitem(last=False)
+
+
+def _last_frame(room_id):
+    """Returns (seq, code_content) of the newest frame for a room, or (None, None)."""
+    if room_id in _last_frames:
+        _last_frames.move_to_end(room_id)
+        return _last_frames[room_id]
+    latest = HistoryFrame.query.filter_by(room_id=room_id).order_by(HistoryFrame.seq.desc()).first()
+    if not latest:
+        return None, None
+    seq, text = latest.seq, _reconstruct(room_id, latest.seq)
+    _cache_frame(room_id, seq, text)
+    return seq, text
+
+
+def _build_frame(room_id, seq, last_text, code_content):
+    interval = current_app.config.get('HISTORY_SNAPSHOT_INTERVAL', 50)
+    frame = HistoryFrame()
+    frame.room_id = room_id
+    frame.seq = seq
+    frame.created_at = datetime.now(timezone.utc)
+    if last_text is None or seq % interval == 0:
+        frame.is_snapshot = True
+        frame.data = _encode_snapshot(code_content)
+    else:
+        frame.data = _encode_delta(last_text, code_content)
+        # A diff that is larger than the code itself is not worth keeping
+        snapshot_data = _encode_snapshot(code_content)
+        if len(snapshot_data) <= len(frame.data):
+            frame.is_snapshot = True
+            frame.data = snapshot_data
+        else:
+            frame.is_snapshot = False
+    return frame
+
+
+def record_code_frame(room_id, code_content, retries=3):
+    """
+    Appends the room's current code to its history and returns the frame's
+    sequence number. Unchanged code does not create a new frame.
+
+    If another process wrote the same sequence number first, the cached last
+    frame was stale: it is re-read from the database and the write retried.
+    """
+    room_id = str(room_id)
+    code_content = code_content or ''
+    with _history_lock:
+        for attempt in range(retries + 1):
+            last_seq, last_text = _last_frame(room_id)
+            if last_text == code_content:
+                return last_seq
+
+            seq = 0 if last_seq is None else last_seq + 1
+            db.session.add(_build_frame(room_id, seq, last_text, code_content))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                _last_frames.pop(room_id, None)
+                if attempt == retries:
+                    raise
+                continue
+            _cache_frame(room_id, seq, code_content)
+            break
+
+    if seq % current_app.config.get('HISTORY_SNAPSHOT_INTERVAL', 50) == 0:
+        prune_history(room_id)
+    return seq
+
+
+def _history_writer(app):
+    while True:
+        room_id = _pending_rooms.get()
+        with _pending_lock:
+            code_content = _pending_code.pop(room_id)
+        with app.app_context():
+            try:
+                record_code_frame(room_id, code_content)
+            except Exception as e:
+                db.session.rollback()
+                print(f"[history] Failed to record code for room {room_id}: {e}")
+
+
+def queue_code_frame(room_id, code_content):
+    """
+    Queues a code change to be written to history by a background task, so
+    history writes stay off the live sync path. If the room already has a
+    change waiting, it is replaced: when the writer falls behind, history
+    keeps the latest code rather than every keystroke.
+    """
+    global _writer_started
+    if not _writer_started:
+        with _writer_lock:
+            if not _writer_started:
+                socketio.start_background_task(_history_writer, current_app._get_current_object())
+                _writer_started = True
+    room_id = str(room_id)
+    with _pending_lock:
+        queued = room_id in _pending_code
+        _pending_code[room_id] = code_content
+    if not queued:
+        _pending_rooms.put(room_id)
+
+
+def prune_history(room_id):
+    """
+    Applies the retention policy for a room. Frames are only dropped up to a
+    snapshot boundary so the remaining history can always be replayed.
+    """
+    room_id = str(room_id)
+    max_frames = current_app.config.get('HISTORY_MAX_FRAMES_PER_ROOM', 5000)
+    retention_days = current_app.config.get('HISTORY_RETENTION_DAYS', 30)
+
+    latest = HistoryFrame.query.filter_by(room_id=room_id).order_by(HistoryFrame.seq.desc()).first()
+    if not latest:
+        return 0
+
+    # Everything before this sequence number is eligible for removal
+    cutoff_seq = latest.seq - max_frames + 1
+    if retention_days:
+        cutoff_time = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        first_recent = HistoryFrame.query.filter(
+            HistoryFrame.room_id == room_id,
+            HistoryFrame.created_at >= cutoff_time,
+        ).order_by(HistoryFrame.created_at, HistoryFrame.seq).first()
+        cutoff_seq = max(cutoff_seq, first_recent.seq if first_recent else latest.seq)
+
+    # Keep the snapshot the first retained frame depends on
+    keep_from = HistoryFrame.query.filter(
+        HistoryFrame.room_id == room_id,
+        HistoryFrame.is_snapshot.is_(True),
+        HistoryFrame.seq <= cutoff_seq,
+    ).order_by(HistoryFrame.seq.desc()).first()
+    if not keep_from:
+        return 0
+
+    removed = HistoryFrame.query.filter(
+        HistoryFrame.room_id == room_id,
+        HistoryFrame.seq < keep_from.seq,
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+
+def seek(room_id, at=None):
+    """
+    Returns (seq, created_at, code_content) for the newest frame recorded at or
+    before `at` (or the newest frame overall), or None if there is none. The
+    lookup uses the (room_id, created_at) index, then replays from the nearest
+    snapshot.
+    """
+    room_id = str(room_id)
+    query = HistoryFrame.query.filter(HistoryFrame.room_id == room_id)
+    if at is not None:
+        query = query.filter(HistoryFrame.created_at <= at)
+    frame = query.order_by(HistoryFrame.created_at.desc(), HistoryFrame.seq.desc()).first()
+    if not frame:
+        return None
+    return frame.seq, frame.created_at, _reconstruct(room_id, frame.seq)
+
+
+def replay(room_id, start=None, end=None, batch_size=500):
+    """
+    Yields {'seq', 'created_at', 'code_content'} dicts for every frame between
+    start and end, beginning with the code as it was at `start` (or the first
+    frame after it if the history starts later).
+    """
+    room_id = str(room_id)
+    if start is not None and end is not None and start > end:
+        return
+    first = seek(room_id, start) if start is not None else None
+    if first is None:
+        # No frame before start (or no start): begin at the oldest frame in the window
+        query = HistoryFrame.query.filter(HistoryFrame.room_id == room_id)
+        if start is not None:
+            query = query.filter(HistoryFrame.created_at >= start)
+        if end is not None:
+            query = query.filter(HistoryFrame.created_at <= end)
+        oldest = query.order_by(HistoryFrame.seq).first()
+        first = (oldest.seq, oldest.created_at, _reconstruct(room_id, oldest.seq)) if oldest else None
+    if not first:
+        return
+
+    seq, created_at, text = first
+    yield _frame_dict(seq, created_at, text)
+
+    while True:
+        query = HistoryFrame.query.filter(
+            HistoryFrame.room_id == room_id,
+            HistoryFrame.seq > seq,
+        )
+        if end is not None:
+            query = query.filter(HistoryFrame.created_at <= end)
+        frames = query.order_by(HistoryFrame.seq).limit(batch_size).all()
+        if not frames:
+            return
+        for frame in frames:
+            text = _apply_frame(frame, text)
+            seq = frame.seq
+            yield _frame_dict(frame.seq, frame.created_at, text)
+
+
+def _frame_dict(seq, created_at, code_content):
+    return {
+        'seq': seq,
+        'created_at': created_at.isoformat() if created_at else None,
+        'code_content': code_content,
+    }
+
+
+def forget_room(room_id):
+    """Drops the cached last frame for a room after its history rows were removed."""
+    with _history_lock:
+        _last_frames.pop(str(room_id), None)
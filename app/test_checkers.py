@@ -0,0 +1,83 @@
+import pytest
+
+from app.checkers import (
+    chunk_text, iter_lines, iter_tokens,
+    compare_exact, compare_lines, compare_tokens, compare_unordered,
+)
+
+
+def chunks(text, size):
+    return chunk_text(text, size)
+
+
+# Small chunk sizes force tokens, lines and whitespace to straddle chunk boundaries
+CHUNK_SIZES = [1, 2, 3, 7, 1024]
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_iter_lines_across_chunks(size):
+    text = "first line\nsecond\n\nlast"
+    assert list(iter_lines(chunks(text, size))) == text.split('\n')
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_iter_tokens_across_chunks(size):
+    text = "  12 abc\n\t3.5  xyz  "
+    assert list(iter_tokens(chunks(text, size))) == text.split()
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+@pytest.mark.parametrize('expected, actual', [
+    ("hello", "hello"),
+    ("  hello\n\n", "hello"),
+    ("a b", "a  b"),
+    ("abc", "ab"),
+    ("ab", "abc"),
+    ("", "   \n"),
+    ("x", ""),
+    ("line 1\nline 2", "line 1\nline 2\n"),
+])
+def test_compare_exact_matches_strip_rule(size, expected, actual):
+    accepted, _ = compare_exact(chunks(expected, size), chunks(actual, size))
+    assert accepted == (expected.strip() == actual.strip())
+
+
+def test_compare_exact_reports_position():
+    accepted, message = compare_exact(chunks("hello world", 4), chunks("hello_world", 3))
+    assert not accepted
+    assert "character 6" in message
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_compare_lines(size):
+    assert compare_lines(chunks("a \nb\n\n\n", size), chunks("a\nb", size))[0]
+    assert not compare_lines(chunks("a\nb", size), chunks("a\nc\n", size))[0]
+    assert not compare_lines(chunks("a\nb", size), chunks("a", size))[0]
+    assert not compare_lines(chunks("a", size), chunks("a\nb", size))[0]
+    # Blank lines in the middle still count
+    assert not compare_lines(chunks("a\n\nb", size), chunks("a\nb", size))[0]
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_compare_tokens(size):
+    assert compare_tokens(chunks("1 2\n3", size), chunks("1  2 3\n", size))[0]
+    assert not compare_tokens(chunks("1 2 3", size), chunks("1 2", size))[0]
+    assert not compare_tokens(chunks("12", size), chunks("1 2", size))[0]
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_compare_tokens_with_epsilon(size):
+    assert compare_tokens(chunks("1.0 2 yes", size), chunks("1.0000001 2.0 yes", size), 1e-6)[0]
+    assert compare_tokens(chunks("1000000", size), chunks("1000000.5", size), 1e-6)[0]
+    assert not compare_tokens(chunks("1.0", size), chunks("1.1", size), 1e-6)[0]
+    assert not compare_tokens(chunks("yes", size), chunks("no", size), 1e-6)[0]
+    # Without an epsilon numbers must match exactly
+    assert not compare_tokens(chunks("1.0", size), chunks("1.00", size))[0]
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+def test_compare_unordered(size):
+    assert compare_unordered(chunks("a\nb\nb\n", size), chunks("b\na\nb", size))[0]
+    assert not compare_unordered(chunks("a\nb\n", size), chunks("b\nb", size))[0]
+    assert not compare_unordered(chunks("a\nb\n", size), chunks("a", size))[0]
+    assert not compare_unordered(chunks("a\n", size), chunks("a\nc", size))[0]
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from app import create_app, db
+from app.models import Problem, TestCase, TestBlob
+from app import problem_import
+from app.problem_import import import_problems
+from config import Config
+
+
+class ImportTestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    ROOM_LIFECYCLE_ENABLED = False
+    TEST_DATA_INLINE_LIMIT = 16
+
+
+@pytest.fixture
+def app():
+    app = create_app(ImportTestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def write_package(root, slug, tests, **meta):
+    package = root / slug
+    (package / 'tests').mkdir(parents=True, exist_ok=True)
+    for old in (package / 'tests').iterdir():
+        old.unlink()
+    (package / 'problem.json').write_text(json.dumps(dict({'title': slug, 'description': 'd'}, **meta)))
+    for name, (test_input, test_output) in tests.items():
+        (package / 'tests' / f"{name}.in").write_text(test_input)
+        (package / 'tests' / f"{name}.out").write_text(test_output)
+
+
+BIG = '"' + 'x' * 100 + '"'
+BIGGER = '"' + 'y' * 100 + '"'
+
+
+def test_import_directory(app, tmp_path):
+    write_package(tmp_path, 'echo', {'1': ('"a"', 'a'), '2': (BIG, 'x' * 100)}, visible_tests=['1'])
+
+    stats = import_problems(str(tmp_path))
+
+    assert stats['created'] == 1 and stats['test_cases'] == 2
+    problem = Problem.query.filter_by(slug='echo').one()
+    assert problem.test_set_version == 1
+    cases = sorted(problem.test_cases, key=lambda case: case.id)
+    assert [case.is_hidden for case in cases] == [False, True]
+    # Small data stays inline, large data goes to a blob
+    assert cases[0].input_blob_hash is None and cases[0].input_text == '"a"'
+    assert cases[1].input_blob_hash and cases[1].input_text == BIG
+    assert ''.join(cases[1].iter_expected_output(7)) == 'x' * 100
+
+
+def test_import_jsonl(app, tmp_path):
+    source = tmp_path / 'bank.jsonl'
+    source.write_text(json.dumps({
+        'slug': 'sum', 'title': 'Sum', 'description': 'd', 'checker': 'float', 'checker_epsilon': 0.01,
+        'test_cases': [{'input': '1, 2', 'output': '3', 'hidden': False}],
+    }) + '\n')
+
+    assert import_problems(str(source))['created'] == 1
+    problem = Problem.query.filter_by(slug='sum').one()
+    assert problem.checker_mode == 'float' and problem.checker_epsilon == 0.01
+    assert problem.test_cases[0].expected_output == '3'
+
+
+def test_rerun_skips_unchanged_without_compressing(app, tmp_path, monkeypatch):
+    write_package(tmp_path, 'echo', {'1': (BIG, 'x' * 100)})
+    import_problems(str(tmp_path))
+
+    def fail(read_chunks):
+        raise AssertionError("unchanged data was compressed again")
+    monkeypatch.setattr(problem_import, '_compress', fail)
+
+    stats = import_problems(str(tmp_path))
+    assert stats['skipped'] == 1 and stats['created'] == stats['updated'] == 0
+
+
+def test_identical_test_data_is_stored_once(app, tmp_path):
+    write_package(tmp_path, 'a', {'1': (BIG, 'x' * 100)})
+    write_package(tmp_path, 'b', {'1': (BIG, 'x' * 100)})
+
+    stats = import_problems(str(tmp_path))
+
+    # One blob for the shared input, one for the shared output
+    assert stats['blobs_stored'] == 2
+    assert TestBlob.query.count() == 2
+
+
+def test_changed_tests_bump_version_and_remove_orphans(app, tmp_path):
+    write_package(tmp_path, 'a', {'1': (BIG, 'ok')})
+    write_package(tmp_path, 'b', {'1': (BIG, 'ok')})
+    import_problems(str(tmp_path))
+
+    # 'b' still uses the old input blob, so it must survive
+    write_package(tmp_path, 'a', {'1': (BIGGER, 'ok')})
+    stats = import_problems(str(tmp_path))
+    assert stats['updated'] == 1 and stats['blobs_removed'] == 0
+    assert Problem.query.filter_by(slug='a').one().test_set_version == 2
+    assert Problem.query.filter_by(slug='b').one().test_set_version == 1
+    assert TestBlob.query.count() == 2
+
+    write_package(tmp_path, 'b', {'1': (BIGGER, 'ok')})
+    stats = import_problems(str(tmp_path))
+    assert stats['blobs_removed'] == 1
+    assert TestBlob.query.count() == 1
+    assert TestCase.query.count() == 2
+
+
+def test_metadata_change_keeps_test_set_version(app, tmp_path):
+    write_package(tmp_path, 'a', {'1': ('"a"', 'a')})
+    import_problems(str(tmp_path))
+
+    write_package(tmp_path, 'a', {'1': ('"a"', 'a')}, description='new description')
+    stats = import_problems(str(tmp_path))
+
+    problem = Problem.query.filter_by(slug='a').one()
+    assert stats['updated'] == 1 and stats['test_cases'] == 0
+    assert problem.description == 'new description'
+    assert problem.test_set_version == 1
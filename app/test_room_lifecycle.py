@@ -0,0 +1,114 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import create_app, db, socketio
+from app.models import Room, RoomArchive
+from app.api_routes import active_users, record_event
+from app.room_lifecycle import archive_idle_rooms, archive_room, load_room
+from app.session_history import record_code_frame
+from config import Config
+
+
+class LifecycleTestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    ROOM_LIFECYCLE_ENABLED = False
+    ROOM_IDLE_MINUTES = 60
+    ROOM_ARCHIVE_BATCH_SIZE = 3
+
+
+@pytest.fixture
+def app():
+    app = create_app(LifecycleTestConfig)
+    with app.app_context():
+        db.create_all()
+        active_users.clear()
+        yield app
+        active_users.clear()
+        db.session.remove()
+        db.drop_all()
+
+
+def add_idle_rooms(count, idle_days=30):
+    last_active = datetime.now(timezone.utc) - timedelta(days=idle_days)
+    for i in range(count):
+        room = Room(id=f"room{i}")
+        room.last_active_at = last_active + timedelta(minutes=i)
+        db.session.add(room)
+    db.session.commit()
+
+
+def test_occupied_rooms_do_not_block_the_batch(app):
+    add_idle_rooms(6)
+    # The three oldest rooms still have someone connected
+    for i in range(3):
+        active_users[f"room{i}"] = [{'username': 'alice', 'socket_id': 'sid'}]
+
+    assert archive_idle_rooms() == 3
+    assert archive_idle_rooms() == 0
+    assert sorted(room.id for room in Room.query.all()) == ['room0', 'room1', 'room2']
+    assert RoomArchive.query.count() == 3
+
+
+def test_disconnect_frees_room_for_archival(app):
+    add_idle_rooms(1)
+    client = socketio.test_client(app)
+    client.emit('join_room', {'room_id': 'room0', 'username': 'alice'})
+    assert active_users['room0']
+
+    # The join itself counts as activity, so age the room again
+    Room.query.get('room0').last_active_at = datetime.now(timezone.utc) - timedelta(days=30)
+    db.session.commit()
+    assert archive_idle_rooms() == 0
+
+    client.disconnect()
+    assert 'room0' not in active_users
+    assert archive_idle_rooms() == 1
+
+
+def test_session_endpoints_restore_archived_room(app):
+    add_idle_rooms(1)
+    record_event('room0', 'join', {'username': 'alice'})
+    record_code_frame('room0', "print('hi')")
+    archive_room('room0')
+
+    client = app.test_client()
+    assert client.get('/api/sessions/room0/timeline').json['total_events'] == 1
+    assert client.get('/api/sessions/room0/summary').json['event_counts'] == {'join': 1}
+    assert client.get('/api/sessions/room0/code').json['code_content'] == "print('hi')"
+    assert client.get('/api/sessions/room0/replay').data.count(b'\n') == 1
+
+
+def test_concurrent_restores_of_the_same_room(tmp_path):
+    # Threads need a shared database, so this test uses a file instead of memory
+    class FileConfig(LifecycleTestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'rooms.db'}"
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        db.create_all()
+        add_idle_rooms(5)
+        for i in range(5):
+            archive_room(f"room{i}")
+
+    errors = []
+    restored = []
+
+    def restore(room_id):
+        with app.app_context():
+            try:
+                restored.append(load_room(room_id) is not None)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=restore, args=(f"room{i % 5}",)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert restored == [True] * 20
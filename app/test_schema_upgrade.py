@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import inspect, text
+
+from app import create_app, db
+from app.models import Problem, Room, TestCase
+from app.room_lifecycle import archive_idle_rooms
+from app.schema_upgrade import upgrade_schema
+from config import Config
+
+
+class UpgradeTestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    ROOM_LIFECYCLE_ENABLED = False
+
+
+# The tables as they were before rooms, problems and test cases gained columns
+OLD_SCHEMA = [
+    "CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80) NOT NULL UNIQUE, password_hash VARCHAR(255) NOT NULL)",
+    "CREATE TABLE problem (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, description TEXT NOT NULL, template_code TEXT)",
+    "CREATE TABLE room (id VARCHAR(10) PRIMARY KEY, code_content TEXT, created_by INTEGER REFERENCES user (id), "
+    "problem_id INTEGER REFERENCES problem (id), language VARCHAR(20) NOT NULL)",
+    "CREATE TABLE test_case (id INTEGER PRIMARY KEY, input_data TEXT NOT NULL, expected_output TEXT NOT NULL, "
+    "is_hidden BOOLEAN NOT NULL, problem_id INTEGER NOT NULL REFERENCES problem (id))",
+    "INSERT INTO problem (id, title, description) VALUES (1, 'Reverse', 'd')",
+    "INSERT INTO room (id, code_content, problem_id, language) VALUES ('old', 'x', 1, 'python')",
+    "INSERT INTO test_case (id, input_data, expected_output, is_hidden, problem_id) VALUES (1, '\"ab\"', 'ba', 0, 1)",
+]
+
+
+@pytest.fixture
+def app():
+    app = create_app(UpgradeTestConfig)
+    with app.app_context():
+        with db.engine.begin() as connection:
+            for statement in OLD_SCHEMA:
+                connection.execute(text(statement))
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_upgrade_adds_columns_to_populated_tables(app):
+    statements = upgrade_schema()
+    assert statements
+
+    problem = Problem.query.get(1)
+    assert problem.test_set_version == 1 and problem.checker_mode == 'exact'
+    assert TestCase.query.get(1).expected_output_text == 'ba'
+    assert Room.query.get('old').last_active_at is not None
+    assert 'ix_room_last_active_at' in {ix['name'] for ix in inspect(db.engine).get_indexes('room')}
+
+    # New rows still get a last_active_at, and the archiver can query rooms
+    db.session.add(Room(id='new'))
+    db.session.commit()
+    assert Room.query.get('new').last_active_at is not None
+    assert archive_idle_rooms() == 0
+
+
+def test_upgrade_is_idempotent(app):
+    upgrade_schema()
+    assert upgrade_schema() == []
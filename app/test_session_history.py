@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import create_app, db
+from app.models import HistoryFrame
+from app import session_history
+from app.session_history import _encode_delta, _apply_frame, record_code_frame, seek, replay
+from config import Config
+
+
+class HistoryTestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    ROOM_LIFECYCLE_ENABLED = False
+    HISTORY_SNAPSHOT_INTERVAL = 3
+    HISTORY_RETENTION_DAYS = 0
+
+
+@pytest.fixture
+def app():
+    app = create_app(HistoryTestConfig)
+    with app.app_context():
+        db.create_all()
+        session_history._last_frames.clear()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+BASE_TIME = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def record_at(room_id, texts):
+    """Records each text as a frame one minute after the previous one."""
+    for i, text in enumerate(texts):
+        seq = record_code_frame(room_id, text)
+        HistoryFrame.query.filter_by(room_id=room_id, seq=seq).update({'created_at': BASE_TIME + timedelta(minutes=i)})
+    db.session.commit()
+
+
+class Delta:
+    def __init__(self, data):
+        self.data = data
+        self.is_snapshot = False
+
+
+@pytest.mark.parametrize('old, new', [
+    ("print('hi')\n", "print('hi!')\n"),
+    ("abc", "abc"),
+    ("", "x = 1\n"),
+    ("x = 1\n", ""),
+    ("aaaa", "aa"),
+    ("abab", "ababab"),
+    ("def f():\n    return 1\n", "def g():\n    return 2\n"),
+])
+def test_delta_round_trip(old, new):
+    assert _apply_frame(Delta(_encode_delta(old, new)), old) == new
+
+
+def test_record_skips_unchanged_code(app):
+    assert record_code_frame('r1', 'a') == 0
+    assert record_code_frame('r1', 'a') == 0
+    assert record_code_frame('r1', 'b') == 1
+
+
+def test_reconstruct_after_cache_is_cleared(app):
+    texts = [f"x = {i}\n" * (i + 1) for i in range(8)]
+    record_at('r1', texts)
+    session_history._last_frames.clear()
+
+    assert [frame['code_content'] for frame in replay('r1')] == texts
+    assert seek('r1')[2] == texts[-1]
+
+
+def test_seek_returns_code_at_time(app):
+    texts = ['a', 'ab', 'abc', 'abcd']
+    record_at('r1', texts)
+
+    assert seek('r1', BASE_TIME + timedelta(minutes=2, seconds=30))[2] == 'abc'
+    assert seek('r1', BASE_TIME - timedelta(minutes=1)) is None
+
+
+def test_replay_window(app):
+    texts = ['a', 'ab', 'abc', 'abcd', 'abcde']
+    record_at('r1', texts)
+
+    frames = replay('r1', BASE_TIME + timedelta(minutes=1, seconds=30), BASE_TIME + timedelta(minutes=3))
+    # Starts with the code as it was at `start`
+    assert [frame['code_content'] for frame in frames] == ['ab', 'abc', 'abcd']
+
+
+def test_replay_window_starting_before_first_frame(app):
+    texts = ['a', 'ab', 'abc']
+    record_at('r1', texts)
+
+    frames = replay('r1', BASE_TIME - timedelta(days=365), BASE_TIME + timedelta(days=365))
+    assert [frame['code_content'] for frame in frames] == texts
+
+
+def test_replay_empty_when_start_after_end(app):
+    record_at('r1', ['a', 'ab'])
+    assert list(replay('r1', BASE_TIME + timedelta(minutes=1), BASE_TIME)) == []
+
+
+def test_queued_changes_coalesce_per_room(app, monkeypatch):
+    # Pretend the writer is running so the queue is left alone
+    monkeypatch.setattr(session_history, '_writer_started', True)
+    monkeypatch.setattr(session_history, '_pending_code', {})
+    monkeypatch.setattr(session_history, '_pending_rooms', session_history.queue.Queue())
+
+    for text in ['a', 'ab', 'abc']:
+        session_history.queue_code_frame('r1', text)
+    session_history.queue_code_frame('r2', 'x')
+
+    assert session_history._pending_rooms.qsize() == 2
+    assert session_history._pending_code == {'r1': 'abc', 'r2': 'x'}
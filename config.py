@@ -12,4 +12,31 @@ class Config:
     # These settings help manage connections that might be closed by the database server.
     SQLALCHEMY_POOL_RECYCLE = 280  # Recycle connections after 280 seconds
     SQLALCHEMY_POOL_TIMEOUT = 20   # Timeout for getting a connection from the pool
-    SQLALCHEMY_POOL_PRE_PING = True # Checks if a connection is alive before using it
\ No newline at end of file
+    SQLALCHEMY_POOL_PRE_PING = True # Checks if a connection is alive before using it
+
+    # --- Session history (code replay) settings ---
+    HISTORY_SNAPSHOT_INTERVAL = int(os.environ.get('HISTORY_SNAPSHOT_INTERVAL', 50))  # Full snapshot every N frames
+    HISTORY_MAX_FRAMES_PER_ROOM = int(os.environ.get('HISTORY_MAX_FRAMES_PER_ROOM', 5000))  # Older frames are pruned
+    HISTORY_RETENTION_DAYS = int(os.environ.get('HISTORY_RETENTION_DAYS', 30))  # Frames older than this are pruned
+    HISTORY_CACHED_ROOMS = int(os.environ.get('HISTORY_CACHED_ROOMS', 1000))  # Rooms whose latest code is kept in memory
+
+
+    # --- Password hashing settings ---
+    # Werkzeug method string, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'.
+    # Changing it rehashes passwords on next login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # Processes used for hashing
+    LOGIN_MAX_CONCURRENT_PER_IP = int(os.environ.get('LOGIN_MAX_CONCURRENT_PER_IP', 4))  # Extra logins get HTTP 429
+
+    # --- Room lifecycle settings ---
+    ROOM_LIFECYCLE_ENABLED = os.environ.get('ROOM_LIFECYCLE_ENABLED', 'true').lower() == 'true'  # Run the idle room archiver
+    ROOM_IDLE_MINUTES = int(os.environ.get('ROOM_IDLE_MINUTES', 7 * 24 * 60))  # Rooms idle this long get archived
+    ROOM_LIFECYCLE_INTERVAL_SECONDS = int(os.environ.get('ROOM_LIFECYCLE_INTERVAL_SECONDS', 300))  # How often to look for idle rooms
+    ROOM_ARCHIVE_BATCH_SIZE = int(os.environ.get('ROOM_ARCHIVE_BATCH_SIZE', 50))  # Max rooms archived per pass
+
+    # --- Problem import settings ---
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 100))  # Problems upserted per transaction
+    TEST_DATA_INLINE_LIMIT = int(os.environ.get('TEST_DATA_INLINE_LIMIT', 64 * 1024))  # Larger test data goes to TestBlob
+
+    # --- Judge settings ---
+    CHECKER_DEFAULT_EPSILON = float(os.environ.get('CHECKER_DEFAULT_EPSILON', 1e-6))  # Used by the float checker
\ No newline at end of file
@@ -0,0 +1,28 @@
+import argparse
+from app import create_app, db
+from app.problem_import import import_problems
+
+# Create a Flask app instance to work with the database
+app = create_app()
+
+def main():
+    """
+    Bulk-loads problems and test cases from a JSONL file or a directory of
+    problem packages. Safe to re-run: unchanged problems are skipped.
+    """
+    parser = argparse.ArgumentParser(description="Import a problem bank into CodeCollab.")
+    parser.add_argument('source', help="JSONL file or directory of problem packages")
+    parser.add_argument('--batch-size', type=int, default=None, help="Problems per transaction")
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        print(f"Importing problems from {args.source}...")
+        stats = import_problems(args.source, batch_size=args.batch_size)
+        print(f"Done. Created {stats['created']}, updated {stats['updated']}, "
+              f"skipped {stats['skipped']} unchanged problems; "
+              f"wrote {stats['test_cases']} test cases and {stats['blobs_stored']} new test blobs; "
+              f"removed {stats['blobs_removed']} unused test blobs.")
+
+if __name__ == '__main__':
+    main()
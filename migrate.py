@@ -0,0 +1,28 @@
+import argparse
+from app import create_app
+from app.schema_upgrade import pending_statements, upgrade_schema
+
+# Create a Flask app instance to work with the database
+app = create_app()
+
+def main():
+    """
+    Brings an existing database up to date: creates new tables and adds the
+    columns and indexes that db.create_all() won't add to existing tables.
+    Safe to re-run.
+    """
+    parser = argparse.ArgumentParser(description="Upgrade the CodeCollab database schema.")
+    parser.add_argument('--dry-run', action='store_true', help="Print the SQL without running it")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.dry_run:
+            statements = pending_statements()
+        else:
+            statements = upgrade_schema()
+        for statement in statements:
+            print(f"{statement};")
+        print(f"Done. {len(statements)} statements {'pending' if args.dry_run else 'applied'}.")
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,12 @@
 from app import create_app, db, socketio
-from app.models import User, Room, SessionEvent
+from app.models import User, Room, SessionEvent, RoomArchive
 
 app = create_app()
 
 @app.shell_context_processor
 def make_shell_context():
     """Makes User, Room, and db available in the `flask shell`."""
-    return {'db': db, 'User': User, 'Room': Room, 'SessionEvent': SessionEvent }
+    return {'db': db, 'User': User, 'Room': Room, 'SessionEvent': SessionEvent, 'RoomArchive': RoomArchive }
 
 if __name__ == "__main__":
     with app.app_context():